@@ -1,16 +1,28 @@
 import streamlit as st
+import google_auth_httplib2
 import google_auth_oauthlib.flow
 import googleapiclient.discovery
+import googleapiclient.discovery_cache
 import googleapiclient.errors
+import httplib2
 import praw
-import os
+import requests
+import html
 import json
-import tempfile
+import secrets
 import time
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from praw.models import Submission
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from streamlit_autorefresh import st_autorefresh
 
 # Streamlit app configuration
 st.set_page_config(page_title="Saved Content Viewer", layout="wide")
 
+SYNC_INTERVAL = 60  # Sync every 60 seconds
+
 # Session state initialization
 if "youtube_credentials" not in st.session_state:
     st.session_state.youtube_credentials = None
@@ -20,26 +32,35 @@ if "youtube_api" not in st.session_state:
     st.session_state.youtube_api = None
 if "reddit" not in st.session_state:
     st.session_state.reddit = None
+if "reddit_me" not in st.session_state:
+    st.session_state.reddit_me = None
 if "youtube_videos" not in st.session_state:
     st.session_state.youtube_videos = []
 if "reddit_posts" not in st.session_state:
     st.session_state.reddit_posts = []
 if "last_sync_time" not in st.session_state:
     st.session_state.last_sync_time = 0
-if "sync_interval" not in st.session_state:
-    st.session_state.sync_interval = 60  # Sync every 60 seconds
+if "refresh_count" not in st.session_state:
+    st.session_state.refresh_count = 0
+if "next_sync_time" not in st.session_state:
+    st.session_state.next_sync_time = 0
 if "oauth_state" not in st.session_state:
     st.session_state.oauth_state = None
 if "oauth_flow" not in st.session_state:
     st.session_state.oauth_flow = None
+if "youtube_auth_url" not in st.session_state:
+    st.session_state.youtube_auth_url = None
 
 # YouTube API setup
 YOUTUBE_SCOPES = ["https://www.googleapis.com/auth/youtube.readonly"]
 YOUTUBE_API_SERVICE_NAME = "youtube"
 YOUTUBE_API_VERSION = "v3"
+YOUTUBE_DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest"
+YOUTUBE_STATE_PREFIX = "yt:"
 
 # Reddit API setup
 REDDIT_REDIRECT_URI = "https://saved-appstreamlit.app"  # Updated to new deployed URL
+REDDIT_STATE_PREFIX = "rd:"
 
 # Load secrets
 try:
@@ -51,142 +72,249 @@ except KeyError as e:
     st.error(f"Missing secret: {e}. Please configure secrets in Streamlit Cloud settings.")
     st.stop()
 
-# Create temporary file for YouTube client secret JSON
-def create_temp_client_secret_file():
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as temp_file:
-        temp_file.write(YOUTUBE_CLIENT_SECRET_JSON)
-        return temp_file.name
+# Parse and validate the YouTube client secret once so a bad secret fails fast
+try:
+    YOUTUBE_CLIENT_CONFIG = json.loads(YOUTUBE_CLIENT_SECRET_JSON)
+except json.JSONDecodeError as e:
+    st.error(f"Invalid YouTube client_secret_json: {e}")
+    st.stop()
+if not isinstance(YOUTUBE_CLIENT_CONFIG, dict) or not (
+    "installed" in YOUTUBE_CLIENT_CONFIG or "web" in YOUTUBE_CLIENT_CONFIG
+):
+    st.error('Invalid YouTube client_secret_json: expected an "installed" or "web" client.')
+    st.stop()
+
+@st.cache_resource(show_spinner=False)
+def get_youtube_discovery_doc():
+    """Load the YouTube discovery document once per process."""
+    doc = googleapiclient.discovery_cache.get_static_doc(
+        YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION
+    )
+    if doc is None:  # Not bundled with this client version, fetch it once
+        response, content = httplib2.Http(timeout=10).request(YOUTUBE_DISCOVERY_URL)
+        if response.status != 200:
+            raise googleapiclient.errors.HttpError(response, content, uri=YOUTUBE_DISCOVERY_URL)
+        doc = content.decode("utf-8")
+    return doc
 
 def get_youtube_api(credentials):
-    """Initialize YouTube API client with credentials."""
-    return googleapiclient.discovery.build(
-        YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, credentials=credentials
+    """Initialize YouTube API client with credentials.
+
+    The client keeps its AuthorizedHttp, so every sync reuses the same keep-alive
+    connection instead of paying a fresh TLS handshake.
+    """
+    authed_http = google_auth_httplib2.AuthorizedHttp(
+        credentials, http=httplib2.Http(timeout=10)
+    )
+    return googleapiclient.discovery.build_from_document(
+        get_youtube_discovery_doc(), http=authed_http
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_reddit_http_session():
+    """Shared requests.Session so praw reuses pooled connections across reruns.
+
+    The session is shared by every user of the app, so cookies are disabled;
+    Reddit OAuth is carried in per-request headers, not cookies.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    # prawcore already retries 5xx and connection errors, so only rate limits
+    # are retried here; the final response still reaches prawcore to be raised.
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3, connect=0, read=0, backoff_factor=0.3,
+            status_forcelist=[429], raise_on_status=False
+        )
+    )
+    session.mount("https://", adapter)
+    return session
+
+def make_reddit():
+    """Create a Reddit client on top of the shared HTTP session."""
+    return praw.Reddit(
+        client_id=REDDIT_CLIENT_ID,
+        client_secret=REDDIT_CLIENT_SECRET,
+        redirect_uri=REDDIT_REDIRECT_URI,
+        user_agent=REDDIT_USER_AGENT,
+        requestor_kwargs={"session": get_reddit_http_session()}
     )
 
 def fetch_youtube_saved_videos(youtube_api):
     """Fetch saved (liked) videos from YouTube."""
-    try:
-        videos = []
-        request = youtube_api.videos().list(
-            part="snippet", myRating="like", maxResults=10
-        )
-        response = request.execute()
-        for item in response.get("items", []):
-            videos.append({
-                "title": item["snippet"]["title"],
-                "url": f"https://www.youtube.com/watch?v={item['id']}",
-                "thumbnail": item["snippet"]["thumbnails"]["default"]["url"]
-            })
-        return videos
-    except googleapiclient.errors.HttpError as e:
-        st.error(f"Error fetching YouTube videos: {e}")
-        return []
-
-def fetch_reddit_saved_posts(reddit):
+    request = youtube_api.videos().list(
+        part="snippet", myRating="like", maxResults=50,
+        fields="items(id,snippet/title,snippet/thumbnails/default/url)"
+    )
+    response = request.execute()
+    # "for snippet in (item["snippet"],)" binds the snippet once per item
+    videos = [
+        {
+            "title": snippet["title"],
+            "url": f"https://youtu.be/{item['id']}",
+            "thumbnail": snippet["thumbnails"]["default"]["url"]
+        }
+        for item in response.get("items", ())
+        for snippet in (item["snippet"],)
+    ]
+    return videos
+
+def fetch_reddit_saved_posts(reddit_me):
     """Fetch saved posts from Reddit."""
-    try:
-        saved_posts = []
-        for item in reddit.user.me().saved(limit=10):
-            if hasattr(item, "title"):  # Submission (post)
-                saved_posts.append({
-                    "title": item.title,
-                    "url": item.permalink,
-                    "subreddit": item.subreddit.display_name
-                })
-        return saved_posts
-    except Exception as e:
-        st.error(f"Error fetching Reddit posts: {e}")
-        return []
+    # type=links has Reddit drop saved comments server-side, so all 10 slots
+    # are posts and fewer bytes come over the wire.
+    items = list(reddit_me.saved(limit=10, params={"type": "links", "raw_json": 1}))
+    # The isinstance check only guards against a stray comment; unlike hasattr
+    # it never triggers praw's lazy fetch. Listing items already carry the
+    # subreddit name, so reading display_name does not hit the network either.
+    saved_posts = [
+        {
+            "title": item.title,
+            "url": f"https://reddit.com{item.permalink}",
+            "subreddit": item.subreddit.display_name
+        }
+        for item in items
+        if isinstance(item, Submission)
+    ]
+    return saved_posts
 
 def youtube_login():
     """Handle YouTube OAuth login."""
-    client_secret_file = create_temp_client_secret_file()
-    try:
-        flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
-            client_secret_file, YOUTUBE_SCOPES
+    # The flow holds this session's OAuth state, so it is built once per session
+    # and reused across reruns rather than cached for every user.
+    if st.session_state.youtube_auth_url is None:
+        flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_config(
+            YOUTUBE_CLIENT_CONFIG, YOUTUBE_SCOPES
         )
         flow.redirect_uri = REDDIT_REDIRECT_URI  # Use the deployed URL
         authorization_url, state = flow.authorization_url(
-            access_type="offline", include_granted_scopes="true"
+            access_type="offline", include_granted_scopes="true",
+            state=YOUTUBE_STATE_PREFIX + secrets.token_urlsafe(16)
         )
         st.session_state.oauth_state = state
         st.session_state.oauth_flow = flow
-        st.markdown(f"[Login to YouTube]({authorization_url})")
-    finally:
-        os.unlink(client_secret_file)  # Clean up temporary file
+        st.session_state.youtube_auth_url = authorization_url
+    st.markdown(f"[Login to YouTube]({st.session_state.youtube_auth_url})")
 
-def reddit_login():
-    """Handle Reddit OAuth login."""
-    reddit = praw.Reddit(
-        client_id=REDDIT_CLIENT_ID,
-        client_secret=REDDIT_CLIENT_SECRET,
-        redirect_uri=REDDIT_REDIRECT_URI,
-        user_agent=REDDIT_USER_AGENT
-    )
-    auth_url = reddit.auth.url(
+@st.cache_data(show_spinner=False)
+def get_reddit_auth_url():
+    """Build the Reddit authorization URL, which only depends on app config."""
+    return make_reddit().auth.url(
         scopes=["identity", "read", "save"],
-        state="uniqueKey",
+        state=REDDIT_STATE_PREFIX + "uniqueKey",
         duration="temporary"
     )
-    st.markdown(f"[Login to Reddit]({auth_url})")
 
-def handle_youtube_callback():
-    """Handle YouTube OAuth callback."""
-    if "code" in st.query_params and "state" in st.query_params:
-        if st.session_state.oauth_state is None or st.session_state.oauth_flow is None:
-            st.error("OAuth state or flow not initialized. Please try logging in again.")
-            return
-        if st.query_params["state"] == st.session_state.oauth_state:
-            flow = st.session_state.oauth_flow
-            try:
-                flow.fetch_token(code=st.query_params["code"])
-                st.session_state.youtube_credentials = flow.credentials
-                st.session_state.youtube_api = get_youtube_api(flow.credentials)
-                st.query_params.clear()
-                sync_content()
-                st.rerun()
-            except Exception as e:
-                st.error(f"Error during YouTube authentication: {e}")
-        else:
-            st.error("OAuth state mismatch. Please try logging in again.")
+def reddit_login():
+    """Handle Reddit OAuth login."""
+    st.markdown(f"[Login to Reddit]({get_reddit_auth_url()})")
 
-def handle_reddit_callback():
-    """Handle Reddit OAuth callback."""
-    if "code" in st.query_params:
+def handle_oauth_callback():
+    """Dispatch an OAuth redirect to the provider that issued it.
+
+    Both providers redirect to the same URL, so the state prefix decides which
+    one the code belongs to.
+    """
+    query_params = st.query_params
+    if "code" not in query_params:
+        return
+    state = query_params.get("state", "")
+    if state.startswith(YOUTUBE_STATE_PREFIX):
+        handle_youtube_callback(query_params)
+    elif state.startswith(REDDIT_STATE_PREFIX):
+        handle_reddit_callback(query_params)
+
+def handle_youtube_callback(query_params):
+    """Handle YouTube OAuth callback."""
+    if st.session_state.youtube_credentials is not None:
+        return  # Already logged in, nothing to handle
+    if st.session_state.oauth_state is None or st.session_state.oauth_flow is None:
+        st.error("OAuth state or flow not initialized. Please try logging in again.")
+        return
+    if query_params["state"] == st.session_state.oauth_state:
+        flow = st.session_state.oauth_flow
         try:
-            reddit = praw.Reddit(
-                client_id=REDDIT_CLIENT_ID,
-                client_secret=REDDIT_CLIENT_SECRET,
-                redirect_uri=REDDIT_REDIRECT_URI,
-                user_agent=REDDIT_USER_AGENT
-            )
-            reddit.auth.authorize(st.query_params["code"])
-            st.session_state.reddit = reddit
-            st.query_params.clear()
+            flow.fetch_token(code=query_params["code"])
+            st.session_state.youtube_credentials = flow.credentials
+            st.session_state.youtube_api = get_youtube_api(flow.credentials)
+            query_params.clear()
+            request_sync()
             sync_content()
             st.rerun()
         except Exception as e:
-            st.error(f"Reddit login failed: {e}")
+            st.error(f"Error during YouTube authentication: {e}")
+    else:
+        st.error("OAuth state mismatch. Please try logging in again.")
+
+def handle_reddit_callback(query_params):
+    """Handle Reddit OAuth callback."""
+    if st.session_state.reddit is not None:
+        return  # Already logged in, nothing to handle
+    try:
+        reddit = make_reddit()
+        reddit.auth.authorize(query_params["code"])
+        # Resolve the Redditor once so syncs skip the /api/v1/me preflight
+        st.session_state.reddit_me = reddit.user.me()
+        st.session_state.reddit = reddit
+        query_params.clear()
+        request_sync()
+        sync_content()
+        st.rerun()
+    except Exception as e:
+        st.error(f"Reddit login failed: {e}")
+
+def request_sync():
+    """Mark a sync as due so the next sync_content call refetches."""
+    st.session_state.next_sync_time = 0
 
 def sync_content():
-    """Sync YouTube and Reddit content if logged in."""
-    current_time = time.time()
-    if current_time - st.session_state.last_sync_time >= st.session_state.sync_interval:
+    """Sync YouTube and Reddit content if logged in.
+
+    Does nothing until the next sync is due, so ordinary reruns stay cheap. When
+    one is due, the fetchers run side by side on worker threads. Those threads
+    have no Streamlit script context, so fetchers raise and this function
+    reports errors and writes session state.
+    """
+    if time.monotonic() < st.session_state.next_sync_time:
+        return
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
         if st.session_state.youtube_api:
-            st.session_state.youtube_videos = fetch_youtube_saved_videos(st.session_state.youtube_api)
+            future = executor.submit(fetch_youtube_saved_videos, st.session_state.youtube_api)
+            jobs[future] = ("youtube_videos", "YouTube videos")
         if st.session_state.reddit:
-            st.session_state.reddit_posts = fetch_reddit_saved_posts(st.session_state.reddit)
-        st.session_state.last_sync_time = current_time
+            future = executor.submit(fetch_reddit_saved_posts, st.session_state.reddit_me)
+            jobs[future] = ("reddit_posts", "Reddit posts")
+        for future in as_completed(jobs):
+            key, label = jobs[future]
+            try:
+                st.session_state[key] = future.result()
+            except Exception as e:
+                st.error(f"Error fetching {label}: {e}")
+                st.session_state[key] = []
+    st.session_state.last_sync_time = time.time()  # Wall clock, for display only
+    st.session_state.next_sync_time = time.monotonic() + SYNC_INTERVAL
 
 # Main app
 st.title("Saved Content Viewer")
 
+# Auto-sync in background: a client-side timer triggers one rerun per interval.
+# Each tick marks a sync as due, because next_sync_time is set after the fetch
+# finishes and so lands slightly after the tick that started it.
+if st.session_state.youtube_credentials or st.session_state.reddit:
+    refresh_count = st_autorefresh(interval=SYNC_INTERVAL * 1000, key="sync_tick")
+    if refresh_count != st.session_state.refresh_count:
+        st.session_state.refresh_count = refresh_count
+        request_sync()
+
 # Handle OAuth callbacks
-handle_youtube_callback()
-handle_reddit_callback()
+handle_oauth_callback()
 
 # Sync content if logged in
-sync_content()
+if st.session_state.youtube_api or st.session_state.reddit:
+    sync_content()
 
 # Tabs for YouTube and Reddit
 tab1, tab2 = st.tabs(["YouTube", "Reddit"])
@@ -199,8 +327,17 @@ with tab1:
     else:
         if st.session_state.youtube_videos:
             for video in st.session_state.youtube_videos:
-                st.image(video["thumbnail"], width=120)
-                st.markdown(f"[{video['title']}]({video['url']})")
+                # Plain <img> lets the browser load thumbnails straight from the
+                # YouTube CDN instead of Streamlit proxying each one. Escape the
+                # API values since the markdown is rendered as raw HTML.
+                url = html.escape(video["url"])
+                thumbnail = html.escape(video["thumbnail"])
+                title = html.escape(video["title"])
+                st.markdown(
+                    f'<a href="{url}"><img src="{thumbnail}" width="120" loading="lazy"></a><br>'
+                    f"[{title}]({url})",
+                    unsafe_allow_html=True
+                )
         else:
             st.write("No saved videos found or an error occurred.")
         st.write(f"Last synced: {time.ctime(st.session_state.last_sync_time)}")
@@ -214,7 +351,7 @@ with tab2:
         if st.session_state.reddit_posts:
             for post in st.session_state.reddit_posts:
                 st.markdown(f"**{post['title']}** (r/{post['subreddit']})")
-                st.markdown(f"[Link](https://reddit.com{post['url']})")
+                st.markdown(f"[Link]({post['url']})")
         else:
             st.write("No saved posts found or an error occurred.")
         st.write(f"Last synced: {time.ctime(st.session_state.last_sync_time)}")
@@ -222,7 +359,7 @@ with tab2:
 # Manual sync and logout buttons
 st.sidebar.header("Controls")
 if st.sidebar.button("Sync Now"):
-    st.session_state.last_sync_time = 0  # Force sync
+    request_sync()
     sync_content()
     st.rerun()
 
@@ -231,13 +368,11 @@ if st.session_state.youtube_credentials or st.session_state.reddit:
     if st.session_state.youtube_credentials and st.sidebar.button("Logout YouTube"):
         st.session_state.youtube_credentials = None
         st.session_state.youtube_api = None
+        st.session_state.youtube_auth_url = None  # Start a fresh OAuth flow next time
         st.session_state.youtube_videos = []
         st.rerun()
     if st.session_state.reddit and st.sidebar.button("Logout Reddit"):
         st.session_state.reddit = None
+        st.session_state.reddit_me = None
         st.session_state.reddit_posts = []
         st.rerun()
-
-# Auto-sync in background
-if st.session_state.youtube_credentials or st.session_state.reddit:
-    st.experimental_rerun() if time.time() - st.session_state.last_sync_time >= st.session_state.sync_interval else None